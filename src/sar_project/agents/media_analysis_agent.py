@@ -1,14 +1,136 @@
+import asyncio
+import hashlib
+import json
+import logging
 import os
+import re
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import numpy as np
 import requests
+from diskcache import Cache
 from dotenv import load_dotenv
-from openai import OpenAI
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 from sar_project.agents.base_agent import SARBaseAgent
 
 # Load API keys from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Model used for relevance checks and summaries, and the JSON mode it answers in
+OPENAI_MODEL = "gpt-4o-mini"
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+# On-disk cache for OpenAI responses, so repeated articles don't cost another call
+CACHE_DIR = os.getenv("SAR_MEDIA_CACHE_DIR", os.path.expanduser("~/.cache/sar_media"))
+CACHE_EXPIRE_SECONDS = 7 * 24 * 3600
+
+# Near-duplicate articles reuse a previous verdict when their embeddings are this similar
+EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_SIMILARITY_THRESHOLD = 0.92
+# The index is stored per embedding model, since vectors from different models can't be compared.
+# Entries older than CACHE_EXPIRE_SECONDS are pruned, and only the newest entries are kept
+# (a run analyzes tens of articles, so this covers many runs while staying a few MB)
+SEMANTIC_INDEX_KEY = f"semantic_index:{EMBEDDING_MODEL}"
+SEMANTIC_INDEX_MAX_ENTRIES = 1000
+
+# Upper bound on in-flight OpenAI requests, keeps us under the API rate limits
+MAX_CONCURRENT_REQUESTS = 20
+
+# How much of each article is sent to OpenAI. Articles are packed into as few
+# requests as possible, up to BATCH_SIZE articles or BATCH_CHAR_BUDGET characters each
+ARTICLE_CHAR_LIMIT = 800
+BATCH_SIZE = 20
+BATCH_CHAR_BUDGET = 12000
+
+# Completion token budget per article in a batch (one-sentence explanation plus a short summary)
+MAX_TOKENS_PER_ARTICLE = 200
+
+# Longest Retry-After we are willing to honor before giving up on waiting for it
+MAX_RETRY_AFTER_SECONDS = 60
+
+_openai_backoff = wait_random_exponential(min=1, max=30)
+
+def _openai_wait(retry_state):
+    """
+    Waits as long as the API's Retry-After header asks, falling back to
+    randomized exponential backoff when the header is missing.
+    Args:
+        retry_state (tenacity.RetryCallState): State of the call being retried.
+    Returns:
+        float: Seconds to wait before the next attempt.
+    """
+    error = retry_state.outcome.exception()
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return min(float(response.headers.get("retry-after")), MAX_RETRY_AFTER_SECONDS)
+        except (TypeError, ValueError):
+            pass
+    return _openai_backoff(retry_state)
+
+# Retry rate limits, timeouts, and server errors from OpenAI
+openai_retry = retry(
+    retry=retry_if_exception_type((RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)),
+    wait=_openai_wait,
+    stop=stop_after_attempt(5),
+    reraise=True,
+)
+
+# Timeout in seconds for HTTP requests to news sources
+REQUEST_TIMEOUT = 10
+
+REQUEST_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+class _CappedRetry(Retry):
+    """urllib3 retry policy that never sleeps longer than MAX_RETRY_AFTER_SECONDS for a Retry-After."""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_AFTER_SECONDS)
+
+GNEWS_SEARCH_URL = "https://gnews.io/api/v4/search"
+GNEWS_PAGE_SIZE = 10
+NEWS_CACHE_EXPIRE_SECONDS = 120
+
+# Query parameters that only track where a click came from, ignored when comparing URLs
+TRACKING_PARAM_PREFIXES = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+# Placeholders for fields missing from a GNews article
+NO_TITLE = "No Title Available"
+NO_URL = "No URL Available"
+NO_CONTENT = "No content available"
+
+# Patterns used to strip filler from article text before it is sent to OpenAI
+WHITESPACE_RE = re.compile(r"\s+")
+# Only sentences that open like page chrome are dropped, so story text that happens to
+# mention cookies or signing up is kept
+BOILERPLATE_RE = re.compile(
+    r"(?:^|(?<=[.!?]))\s*(?:we use cookies|this (?:site|website) uses cookies|"
+    r"by (?:continuing|using) (?:to (?:use|browse) )?(?:this|our) (?:site|website)|accept (?:all )?cookies|"
+    r"subscribe to (?:our|the) newsletter|sign up for (?:our|the) (?:free )?newsletter|"
+    r"click here to (?:read|subscribe|sign up))[^.!?]*[.!?]?"
+    r"|^[ \t]*advertisement[ \t]*$|\[\+?\d+ chars\]",
+    re.IGNORECASE | re.MULTILINE
+)
+# Fillers that can be dropped without changing what a sentence says
+HEDGING_RE = re.compile(
+    r"\b(?:basically|literally|needless to say),? ?",
+    re.IGNORECASE
+)
+
 class MediaAnalysisAgent(SARBaseAgent):
-    def __init__(self, name="media_analysis"):
+    def __init__(self, name="media_analysis", cache_dir=CACHE_DIR, keywords=None):
         super().__init__(
             name=name,
             role="Media Analysis Agent",
@@ -19,9 +141,42 @@ class MediaAnalysisAgent(SARBaseAgent):
             3. Use OpenAI to verify relevance to SAR.
             4. If relevant, provide a summary and description of relevance."""
         )
+        # Default search words, used when a request doesn't provide its own
+        self._keywords = keywords
         self.news_api_key = os.getenv("NEWS_API_KEY")
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=self.openai_api_key)
+        self.session = self._create_session()
+        self._cache = Cache(cache_dir)
+        # Normalized article embeddings (one row per entry), their verdicts, and when they were added.
+        # Loaded from disk on first use, so constructing an agent stays cheap
+        self._semantic_index = None
+        self._semantic_index_loaded = False
+        # One OpenAI request limit per event loop, shared by everything the agent runs on it
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._semaphores_lock = threading.Lock()
+
+    def _create_session(self):
+        """
+        Creates a shared HTTP session so repeated requests reuse pooled
+        keep-alive connections instead of opening a new one each time.
+        Returns:
+            requests.Session: Session with retries on transient errors.
+        """
+        session = requests.Session()
+        session.headers.update(REQUEST_HEADERS)
+        retries = _CappedRetry(
+            total=5,
+            backoff_factor=0.5,
+            backoff_jitter=0.5,
+            backoff_max=30,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=retries)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
 
     def get_keywords_from_user(self):
         """
@@ -37,7 +192,8 @@ class MediaAnalysisAgent(SARBaseAgent):
                 keywords.append(word)
 
         query = " ".join(keywords) if keywords else None
-        print(f"\n📡 Debug: User Search Query -> {query}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("User search query -> %s", query)
         return query
 
     def fetch_news_articles(self, query):
@@ -52,11 +208,25 @@ class MediaAnalysisAgent(SARBaseAgent):
             print("\n⚠️ No search query provided. Skipping GNews API request.")
             return []
     
-        gnews_api_key = os.getenv("GNEWS_API_KEY")
-        url = f"https://gnews.io/api/v4/search?q={query}&token={gnews_api_key}&lang=en&max=10"
+        # Repeated searches within a couple of minutes get the same results, so
+        # reuse them instead of spending another request of the GNews quota. The key is
+        # the query as sent, since word order and case matter to GNews operators like NOT
+        search_key = hashlib.sha1(f"{WHITESPACE_RE.sub(' ', query).strip()}|{GNEWS_PAGE_SIZE}".encode()).hexdigest()
+        cache_key = f"gnews:{search_key}"
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        params = {
+            "q": query,
+            "lang": "en",
+            "sortby": "publishedAt",
+            "max": GNEWS_PAGE_SIZE,
+            "token": os.getenv("GNEWS_API_KEY")
+        }
     
         try:
-            response = requests.get(url)
+            response = self.session.get(GNEWS_SEARCH_URL, params=params, timeout=REQUEST_TIMEOUT)
             if response.status_code == 401:
                 print("\n❌ Error: Unauthorized. Check if your GNews API key is valid.")
                 return []
@@ -65,94 +235,536 @@ class MediaAnalysisAgent(SARBaseAgent):
                 return []
     
             articles = response.json().get("articles", [])
-            print(f"\n📡 Debug: Received {len(articles)} articles from GNews API.")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Received %d articles from GNews API.", len(articles))
     
-            return [
-                {
-                    "title": art.get("title", "No Title Available"),
-                    "url": art.get("url", "No URL Available"),
-                    "content": art.get("description") or "No content available"
-                }
-                for art in articles
-            ]
+            # The same story can come back more than once, under the same URL (give or
+            # take tracking parameters) or with the same text, only analyze it once
+            seen_urls = set()
+            seen_hashes = set()
+            parsed_articles = []
+            for art in articles:
+                url = art.get("url")
+                # The description is the cleaner summary, the truncated body is the fallback
+                content = art.get("description") or art.get("content")
+                if url:
+                    normalized_url = self._normalize_url(url)
+                    if normalized_url in seen_urls:
+                        continue
+                    seen_urls.add(normalized_url)
+                if content:
+                    content_hash = hashlib.blake2b(
+                        WHITESPACE_RE.sub(" ", content[:4000]).strip().lower().encode(), digest_size=16
+                    ).digest()
+                    if content_hash in seen_hashes:
+                        continue
+                    seen_hashes.add(content_hash)
+                parsed_articles.append({
+                    "title": art.get("title") or NO_TITLE,
+                    "url": url or NO_URL,
+                    "content": content or NO_CONTENT
+                })
+
+            self._cache.set(cache_key, parsed_articles, expire=NEWS_CACHE_EXPIRE_SECONDS)
+            return parsed_articles
     
         except Exception as e:
             print(f"\n❌ Error fetching news articles: {e}")
             return []
 
-    def check_relevance_with_openai(self, article_text, query):
+    def _normalize_url(self, url):
         """
-        Uses OpenAI to determine if an article is relevant to SAR.
+        Normalizes an article URL so trivially different links to the same
+        story compare equal.
+        Args:
+            url (str): The article URL.
+        Returns:
+            str: The URL with a lowercase scheme and host, no fragment, no
+            tracking query parameters, and no trailing slash.
+        """
+        parts = urlsplit(url.strip())
+        query = urlencode([
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+        ])
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
+    async def classify_and_summarize(self, article_text, query):
+        """
+        Decides if a single article is relevant to SAR and, if it is, summarizes it.
         Args:
             article_text (str): The article text to evaluate.
             query (str): The user-provided search query.
         Returns:
-            bool: True if the article is relevant, False otherwise.
+            tuple: (is_relevant, explanation, summary), where summary is None
+            if the article is not relevant.
         """
-        if not article_text or article_text == "No content available":
-            print("\n⚠️ Skipping article due to lack of valid content.")
-            return False, "Article has no valid content to analyze."
+        verdicts = await self.classify_and_summarize_batch([article_text], query)
+        return verdicts[0]
 
-        prompt = f"""
-        Determine if the following article is relevant to Search and Rescue (SAR) efforts based on the search words: {query}.
-        If the article is related to SAR operations (e.g., rescues, missing persons, disaster response), return 'Yes' with a brief explanation.
-        Otherwise, return 'No'.
+    async def classify_and_summarize_batch(self, article_texts, query):
+        """
+        Decides which articles are relevant to SAR and summarizes the relevant ones.
+        Cached verdicts are reused, and the remaining articles are packed into
+        as few OpenAI requests as possible.
+        Args:
+            article_texts (list): The article texts to evaluate.
+            query (str): The user-provided search query.
+        Returns:
+            list: One (is_relevant, explanation, summary) tuple per article, in order.
+        """
+        article_texts = list(article_texts)
+        verdicts = [None] * len(article_texts)
+        cache_keys = [None] * len(article_texts)
+
+        pending = []
+        for i, article_text in enumerate(article_texts):
+            if not article_text or article_text == NO_CONTENT:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Skipping article %d due to lack of valid content.", i)
+                verdicts[i] = (False, "Article has no valid content to analyze.", None)
+                continue
+
+            article_texts[i] = article_text = self._compress(article_text)
+            if not article_text:
+                verdicts[i] = (False, "Article has no valid content to analyze.", None)
+                continue
+
+            cache_keys[i] = self._cache_key(article_text, query)
+            cached = self._cache.get(cache_keys[i])
+            if cached is not None:
+                verdicts[i] = cached
+            else:
+                pending.append(i)
 
-        Article:
-        {article_text[:1500]}
+        if not pending:
+            return verdicts
+
+        # The async client's pooled connections belong to the loop that opened them, so
+        # each run opens its own client and closes it before the loop goes away.
+        # Retries are handled by tenacity, so the client's own retry loop is disabled.
+        async with AsyncOpenAI(api_key=self.openai_api_key, max_retries=0) as client:
+            await self._analyze_pending(client, article_texts, query, pending, cache_keys, verdicts)
+        return verdicts
+
+    async def _analyze_pending(self, client, article_texts, query, pending, cache_keys, verdicts):
+        """
+        Fills in verdicts for the articles that missed the exact-match cache,
+        from the semantic cache where possible and otherwise from OpenAI.
+        Args:
+            client (openai.AsyncOpenAI): Client opened for the current run.
+            article_texts (list): The compressed article texts.
+            query (str): The user-provided search query.
+            pending (list): Indices of the articles still without a verdict.
+            cache_keys (list): Exact-match cache keys, by article index.
+            verdicts (list): Verdicts by article index, updated in place.
         """
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
+        try:
+            embeddings = await self._embed(
+                client, [f"Search words: {query}\n\n{article_texts[i][:1500]}" for i in pending]
+            )
+        except Exception as e:
+            logger.warning("Skipping semantic cache lookup, embedding failed: %s", e)
+            embeddings = [None] * len(pending)
+
+        # Reading and writing the index is blocking disk work, so it runs off the event loop
+        loop = asyncio.get_running_loop()
+        if not self._semantic_index_loaded:
+            index = await loop.run_in_executor(None, self._load_semantic_index)
+            if not self._semantic_index_loaded:
+                self._semantic_index, self._semantic_index_loaded = index, True
+
+        uncached = []
+        for i, embedding in zip(pending, embeddings):
+            similar = self._find_similar_verdict(embedding)
+            if similar is not None:
+                verdicts[i] = similar
+                self._cache.set(cache_keys[i], similar, expire=CACHE_EXPIRE_SECONDS)
+            else:
+                uncached.append((i, embedding))
+
+        semaphore = self._get_semaphore()
+        batches = self._make_batches(uncached, article_texts)
+        outcomes = await asyncio.gather(
+            *[self._request_verdicts(client, [article_texts[i] for i, _ in batch], query, semaphore) for batch in batches],
+            return_exceptions=True
         )
-        response_text = response.choices[0].message.content.strip().lower()
 
-        print(f"\n📡 Debug: OpenAI Response for relevance -> {response_text}")  # DEBUG
+        remembered = []
+        for batch, outcome in zip(batches, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"\n❌ Error analyzing articles with OpenAI: {outcome}")
+                outcome = [None] * len(batch)
+            for (i, embedding), verdict in zip(batch, outcome):
+                if verdict is None:
+                    verdicts[i] = (False, "OpenAI returned no verdict for this article.", None)
+                    continue
+                verdicts[i] = verdict
+                self._cache.set(cache_keys[i], verdict, expire=CACHE_EXPIRE_SECONDS)
+                if embedding is not None:
+                    remembered.append((embedding, verdict))
+
+        if remembered:
+            await loop.run_in_executor(None, self._remember_verdicts, remembered)
+
+    def _get_semaphore(self):
+        """
+        Returns the semaphore bounding in-flight OpenAI requests on the running
+        event loop, so the bound holds across concurrently gathered searches.
+        Returns:
+            asyncio.Semaphore: The semaphore for the running loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._semaphores_lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        return semaphore
 
-        return "yes" in response_text or "likely" in response_text, response_text
+    def _make_batches(self, items, article_texts):
+        """
+        Groups articles so each OpenAI request stays within BATCH_SIZE articles
+        and BATCH_CHAR_BUDGET characters of article text.
+        Args:
+            items (list): (index, embedding) pairs of the articles to send.
+            article_texts (list): All article texts, looked up by index.
+        Returns:
+            list: Lists of (index, embedding) pairs, one list per request.
+        """
+        batches = []
+        batch, batch_chars = [], 0
+        for item in items:
+            size = min(len(article_texts[item[0]]), ARTICLE_CHAR_LIMIT)
+            if batch and (len(batch) == BATCH_SIZE or batch_chars + size > BATCH_CHAR_BUDGET):
+                batches.append(batch)
+                batch, batch_chars = [], 0
+            batch.append(item)
+            batch_chars += size
+        if batch:
+            batches.append(batch)
+        return batches
 
-    def summarize_with_openai(self, article_text):
+    async def _request_verdicts(self, client, article_texts, query, semaphore):
         """
-        Generates a summary of the article using OpenAI.
+        Sends a group of articles to OpenAI in a single JSON-mode request.
         Args:
-            article_text (str): The article text to summarize.
+            client (openai.AsyncOpenAI): Client opened for the current run.
+            article_texts (list): The article texts to evaluate.
+            query (str): The user-provided search query.
+            semaphore (asyncio.Semaphore): Limits concurrent OpenAI requests.
         Returns:
-            str: A concise summary of the article.
+            list: One (is_relevant, explanation, summary) tuple per article, or
+            None for articles the response did not cover.
         """
+        articles_block = "".join(
+            f"\n\n---ARTICLE {i}---\n{text[:ARTICLE_CHAR_LIMIT]}" for i, text in enumerate(article_texts)
+        )
         prompt = f"""
-        Summarize the following news article in 3-4 sentences while preserving key details:
-
-        {article_text[:3000]}
+        For each article below (indexed 0..{len(article_texts) - 1}), determine if it is relevant to
+        Search and Rescue (SAR) efforts based on the search words: {query}.
+        An article is relevant if it is related to SAR operations (e.g., rescues, missing persons, disaster response).
+        Return JSON of the form {{"articles": [...]}} with one object per article, each with the keys:
+        - "i": the article index
+        - "relevant": "yes" or "no"
+        - "explanation": a one-sentence explanation of the decision
+        - "summary": a 3-4 sentence summary preserving key details, or an empty string if not relevant
+        {articles_block}
         """
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
+        response = await self._create_completion(
+            client,
+            semaphore,
+            model=OPENAI_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            response_format=JSON_RESPONSE_FORMAT,
+            max_tokens=MAX_TOKENS_PER_ARTICLE * len(article_texts)
         )
-        summary = response.choices[0].message.content.strip()
 
-        print(f"\n📡 Debug: OpenAI Summary -> {summary[:200]}...")  # DEBUG
-        return summary
+        # A response cut off at max_tokens is incomplete JSON, so ask again in smaller batches.
+        # Each half is retried on its own, and one failing half leaves the other's verdicts intact
+        if response.choices[0].finish_reason == "length":
+            if len(article_texts) == 1:
+                logger.warning("OpenAI response was truncated, no verdict for this article.")
+                return [None]
+            logger.warning("OpenAI response was truncated, retrying %d articles in two batches.", len(article_texts))
+            half = len(article_texts) // 2
+            halves = [article_texts[:half], article_texts[half:]]
+            outcomes = await asyncio.gather(
+                *[self._request_verdicts(client, texts, query, semaphore) for texts in halves],
+                return_exceptions=True
+            )
+            verdicts = []
+            for texts, outcome in zip(halves, outcomes):
+                if isinstance(outcome, Exception):
+                    print(f"\n❌ Error analyzing articles with OpenAI: {outcome}")
+                    outcome = [None] * len(texts)
+                verdicts.extend(outcome)
+            return verdicts
 
-    def analyze_media(self):
+        response_text = response.choices[0].message.content
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("OpenAI response for relevance -> %s", response_text)
+
+        verdicts = [None] * len(article_texts)
+        try:
+            entries = json.loads(response_text).get("articles", [])
+        except (json.JSONDecodeError, AttributeError, TypeError):
+            # TypeError covers a missing body, e.g. a refusal or a content_filter finish
+            return verdicts
+
+        for entry in entries:
+            try:
+                i = int(entry.get("i"))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if not 0 <= i < len(article_texts):
+                continue
+
+            relevant = entry.get("relevant")
+            is_relevant = relevant is True or str(relevant).strip().lower() in ("yes", "true")
+            explanation = str(entry.get("explanation") or "").strip()
+            summary = str(entry.get("summary") or "").strip() if is_relevant else None
+            verdicts[i] = (is_relevant, explanation, summary)
+
+        return verdicts
+
+    @openai_retry
+    async def _create_completion(self, client, semaphore, **kwargs):
+        """
+        Makes one chat completion request, retried on transient API errors.
+        Args:
+            client (openai.AsyncOpenAI): Client opened for the current run.
+            semaphore (asyncio.Semaphore): Limits concurrent OpenAI requests.
+            **kwargs: Arguments for client.chat.completions.create.
+        Returns:
+            openai.types.chat.ChatCompletion: The completion.
+        """
+        async with semaphore:
+            return await client.chat.completions.create(**kwargs)
+
+    def _compress(self, text):
+        """
+        Strips boilerplate and filler from article text, so the part kept for
+        OpenAI carries more of the actual story in fewer tokens.
+        Args:
+            text (str): The raw article text.
+        Returns:
+            str: The compressed text.
+        """
+        text = BOILERPLATE_RE.sub(" ", text)
+        text = HEDGING_RE.sub("", text)
+        return WHITESPACE_RE.sub(" ", text).strip()
+
+    def _cache_key(self, article_text, query):
+        """
+        Builds the exact-match cache key for an article's verdict.
+        Args:
+            article_text (str): The article text.
+            query (str): The user-provided search query.
+        Returns:
+            str: SHA-256 hex digest of the model, query, and article text.
+        """
+        return hashlib.sha256(f"{OPENAI_MODEL}|{query}|{article_text[:ARTICLE_CHAR_LIMIT]}".encode()).hexdigest()
+
+    @openai_retry
+    async def _embed(self, client, texts):
+        """
+        Embeds texts with OpenAI for the semantic cache, in a single request.
+        Args:
+            client (openai.AsyncOpenAI): Client opened for the current run.
+            texts (list): The texts to embed.
+        Returns:
+            list: The L2-normalized embeddings, as numpy arrays, in order.
+        """
+        response = await client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+        embeddings = []
+        for item in response.data:
+            embedding = np.array(item.embedding, dtype="float32")
+            embeddings.append(embedding / np.linalg.norm(embedding))
+        return embeddings
+
+    def _load_semantic_index(self):
+        """
+        Reads the semantic cache index from disk, without the expired entries.
+        Returns:
+            tuple: (embeddings, verdicts, timestamps), or None if the index is empty.
+        """
+        index = self._cache.get(SEMANTIC_INDEX_KEY)
+        if index is None:
+            return None
+        embeddings, verdicts, timestamps = index
+        fresh = timestamps >= time.time() - CACHE_EXPIRE_SECONDS
+        if not fresh.any():
+            return None
+        return embeddings[fresh], [v for v, keep in zip(verdicts, fresh) if keep], timestamps[fresh]
+
+    def _find_similar_verdict(self, embedding):
+        """
+        Looks up the verdict of the most similar previously analyzed article.
+        Args:
+            embedding (numpy.ndarray): Normalized embedding of the new article.
+        Returns:
+            tuple: The cached (is_relevant, explanation, summary), or None if
+            no previous article is similar enough.
+        """
+        index = self._semantic_index
+        if embedding is None or index is None:
+            return None
+
+        embeddings, verdicts, _ = index
+        # An index built from differently sized vectors can't be compared, so treat it as a miss
+        if embeddings.shape[1] != embedding.shape[0]:
+            return None
+
+        # Embeddings are normalized, so the inner product is the cosine similarity
+        similarities = embeddings @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] >= SEMANTIC_SIMILARITY_THRESHOLD:
+            return verdicts[best]
+        return None
+
+    def _remember_verdicts(self, entries):
+        """
+        Adds article embeddings and their verdicts to the semantic cache, in a
+        single write. The stored index is re-read first, so entries added by
+        other agents sharing the cache directory are kept.
+        Args:
+            entries (list): (embedding, verdict) pairs, with normalized embeddings.
+        """
+        new_embeddings = np.vstack([embedding for embedding, _ in entries])
+        new_verdicts = [verdict for _, verdict in entries]
+        new_timestamps = np.full(len(entries), time.time())
+
+        with self._cache.transact():
+            index = self._load_semantic_index()
+            if index is not None and index[0].shape[1] == new_embeddings.shape[1]:
+                embeddings = np.vstack([index[0], new_embeddings])
+                verdicts = index[1] + new_verdicts
+                timestamps = np.concatenate([index[2], new_timestamps])
+            else:
+                embeddings, verdicts, timestamps = new_embeddings, new_verdicts, new_timestamps
+
+            # Keep only the newest entries, so the index stays small enough to load and search
+            embeddings = embeddings[-SEMANTIC_INDEX_MAX_ENTRIES:]
+            verdicts = verdicts[-SEMANTIC_INDEX_MAX_ENTRIES:]
+            timestamps = timestamps[-SEMANTIC_INDEX_MAX_ENTRIES:]
+            self._cache.set(SEMANTIC_INDEX_KEY, (embeddings, verdicts, timestamps))
+
+        self._semantic_index = (embeddings, verdicts, timestamps)
+        self._semantic_index_loaded = True
+
+    def filter_by_keywords(self, articles, query):
+        """
+        Keeps only the articles whose title or content mentions at least one
+        of the search words, a free check that spares OpenAI calls on
+        clearly off-topic articles.
+        Args:
+            articles (list): Articles returned by fetch_news_articles.
+            query (str): The user-provided search query.
+        Returns:
+            list: The articles that mention a search word.
+        """
+        keywords = frozenset(word.lower() for word in (query or "").split())
+        if not keywords:
+            return articles
+
+        # One case-insensitive pass per field instead of a substring scan per keyword
+        keyword_re = re.compile("|".join(re.escape(keyword) for keyword in keywords), re.IGNORECASE)
+        return [
+            article for article in articles
+            if keyword_re.search(article["title"]) or keyword_re.search(article["content"])
+        ]
+
+    async def analyze_articles(self, articles, query):
+        """
+        Verifies relevance and summarizes all articles, batching the OpenAI requests.
+        Articles that mention none of the search words are dropped before OpenAI
+        is called.
+        Args:
+            articles (list): Articles returned by fetch_news_articles.
+            query (str): The user-provided search query.
+        Returns:
+            list: The relevant articles with summaries.
+        """
+        articles = self.filter_by_keywords(articles, query)
+        if not articles:
+            return []
+
+        verdicts = await self.classify_and_summarize_batch([article["content"] for article in articles], query)
+
+        return [
+            {
+                "url": article["url"],
+                "title": article["title"],
+                "summary": summary,
+                "relevance": relevance_explanation
+            }
+            for article, (is_relevant, relevance_explanation, summary) in zip(articles, verdicts)
+            if is_relevant
+        ]
+
+    def analyze_media(self, keywords=None):
         """
         Fetches SAR news articles, verifies relevance with OpenAI, and summarizes them.
+        Args:
+            keywords (list): Search words to use, or a comma-separated string of them.
+                If omitted, the words given to the constructor or the SAR_KEYWORDS
+                environment variable (comma-separated) are used, and otherwise the user
+                is prompted, but only when running interactively.
         Returns:
             list: A list of relevant articles with summaries.
         """
-        query = self.get_keywords_from_user()
-        articles = self.fetch_news_articles(query)
-
-        results = []
-        for article in articles:
-            is_relevant, relevance_explanation = self.check_relevance_with_openai(article["content"], query)
-            if is_relevant:
-                summary = self.summarize_with_openai(article["content"])
-                results.append({
-                    "url": article["url"],
-                    "title": article["title"],
-                    "summary": summary,
-                    "relevance": relevance_explanation
-                })
+        if keywords is None:
+            keywords = self._keywords
+        if keywords is None and os.getenv("SAR_KEYWORDS"):
+            keywords = os.getenv("SAR_KEYWORDS")
+        # A single string would otherwise be joined character by character
+        if isinstance(keywords, str):
+            keywords = keywords.split(",")
+
+        if keywords is not None:
+            query = " ".join(str(word).strip() for word in keywords if str(word).strip()) or None
+        elif sys.stdin is not None and sys.stdin.isatty():
+            query = self.get_keywords_from_user()
+        else:
+            query = None
+
+        return self._run(self.search_and_analyze(query))
+
+    def _run(self, coroutine):
+        """
+        Runs a coroutine to completion on a fresh event loop, so the sync entry
+        points can be called from several threads at once, or from code that is
+        already running inside an event loop.
+        Args:
+            coroutine: The coroutine to run.
+        Returns:
+            The coroutine's result.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+
+        # A loop is already running in this thread, so run ours in a worker thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+
+    async def search_and_analyze(self, query):
+        """
+        Runs the whole pipeline for one query on the running event loop: the
+        GNews search runs in a worker thread so it does not block the loop, then
+        the articles are analyzed with OpenAI. Several queries can be searched
+        concurrently by gathering this coroutine.
+        Args:
+            query (str): The search query.
+        Returns:
+            list: A list of relevant articles with summaries.
+        """
+        loop = asyncio.get_running_loop()
+        articles = await loop.run_in_executor(None, self.fetch_news_articles, query)
+
+        results = await self.analyze_articles(articles, query)
 
         if not results:
             print("\n⚠️ No SAR-related articles found after verification.")
@@ -163,9 +775,14 @@ class MediaAnalysisAgent(SARBaseAgent):
     def process_request(self, message):
         """
         Handle incoming requests from users.
+        Args:
+            message (dict): The request, e.g. {"action": "search_news", "keywords": ["flood", "rescue"]}.
+                "keywords" is optional; without it the words given to the constructor or the
+                SAR_KEYWORDS environment variable are used, and otherwise the user is prompted,
+                but only when running interactively.
         Returns:
             dict: Processed results.
         """
         if message.get("action") == "search_news":
-            return self.analyze_media()
+            return self.analyze_media(message.get("keywords"))
         return {"error": "Invalid request. Use {'action': 'search_news'} to fetch SAR news."}
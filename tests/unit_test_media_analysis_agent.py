@@ -1,15 +1,57 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import numpy as np
 import pytest
-from unittest.mock import patch, MagicMock
-from sar_project.agents.media_analysis_agent import MediaAnalysisAgent
+from openai import RateLimitError
+from tenacity import wait_none
+from unittest.mock import patch, AsyncMock, MagicMock
+from sar_project.agents.media_analysis_agent import (
+    ARTICLE_CHAR_LIMIT, CACHE_EXPIRE_SECONDS, MAX_RETRY_AFTER_SECONDS, MAX_TOKENS_PER_ARTICLE, SEMANTIC_INDEX_KEY, MediaAnalysisAgent, _openai_wait
+)
+
+def fake_embedding(text):
+    """Deterministic pseudo-random embedding, so different texts are dissimilar."""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+    return np.random.default_rng(seed).normal(size=64).tolist()
+
+def normalized_embedding(text):
+    """fake_embedding as the agent stores it, a normalized numpy vector."""
+    embedding = np.array(fake_embedding(text), dtype="float32")
+    return embedding / np.linalg.norm(embedding)
+
+def embedding_response(model, input):
+    """Stand-in for the OpenAI embeddings endpoint."""
+    return MagicMock(data=[MagicMock(embedding=fake_embedding(text)) for text in input])
+
+def chat_response(verdicts):
+    """Builds a mocked batched chat completion for the given verdict objects."""
+    content = json.dumps({"articles": verdicts})
+    return MagicMock(choices=[MagicMock(message=MagicMock(content=content), finish_reason="stop")])
 
 @pytest.fixture
-def agent():
-    """Initialize the media analysis agent."""
-    return MediaAnalysisAgent()
+def openai_client():
+    """Mocked AsyncOpenAI client, handed out for every run the agent opens."""
+    client = MagicMock()
+    client.__aenter__.return_value = client
+    client.__aexit__.return_value = False
+    client.embeddings.create = AsyncMock(side_effect=embedding_response)
+    client.chat.completions.create = AsyncMock()
+    with patch("sar_project.agents.media_analysis_agent.AsyncOpenAI", return_value=client):
+        yield client
+
+@pytest.fixture
+def agent(tmp_path, openai_client):
+    """Initialize the media analysis agent with an empty response cache."""
+    return MediaAnalysisAgent(cache_dir=str(tmp_path / "cache"))
 
 def test_fetch_news_articles_success(agent):
     """Test fetching news articles successfully from GNews API."""
-    with patch("requests.get") as mock_get:
+    with patch.object(agent.session, "get") as mock_get:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {
@@ -23,9 +65,87 @@ def test_fetch_news_articles_success(agent):
         assert len(articles) == 1
         assert articles[0]["title"] == "SAR Team Rescues Hiker"
 
+def test_fetch_news_articles_deduplicates_urls(agent):
+    """Test that the same article returned twice is only analyzed once."""
+    with patch.object(agent.session, "get") as mock_get:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "articles": [
+                {"title": "SAR Team Rescues Hiker", "url": "https://example.com/rescue", "description": "SAR teams saved a hiker."},
+                {"title": "SAR Team Rescues Hiker", "url": "https://example.com/rescue", "description": "SAR teams saved a hiker."}
+            ]
+        }
+        mock_get.return_value = mock_response
+
+        articles = agent.fetch_news_articles("hiker rescue")
+        assert len(articles) == 1
+        assert mock_get.call_args.kwargs["params"]["q"] == "hiker rescue"
+
+def test_fetch_news_articles_deduplicates_tracking_urls_and_copies(agent):
+    """Test that tracking-parameter URL variants and copied text are treated as duplicates."""
+    with patch.object(agent.session, "get") as mock_get:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "articles": [
+                {"title": "Flood Rescue", "url": "https://News.example.com/flood/?id=7", "description": "Crews rescued 12 people."},
+                {"title": "Flood Rescue", "url": "https://news.example.com/flood?id=7&utm_source=x#top", "description": "Updated."},
+                {"title": "Flood Rescue", "url": "https://other.example.com/story", "description": "Crews  rescued 12 people."},
+                {"title": "Second Flood", "url": "https://news.example.com/flood?id=8", "description": "Crews searched the river."}
+            ]
+        }
+        mock_get.return_value = mock_response
+
+        articles = agent.fetch_news_articles("flood rescue")
+        assert [a["url"] for a in articles] == [
+            "https://News.example.com/flood/?id=7",
+            "https://news.example.com/flood?id=8"
+        ]
+
+def test_fetch_news_articles_falls_back_to_content(agent):
+    """Test that an article without a description keeps its content body."""
+    with patch.object(agent.session, "get") as mock_get:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "articles": [
+                {"title": "Hiker Found", "url": "https://example.com/a", "description": None,
+                 "content": "Crews found the missing hiker. [+1200 chars]"},
+                {"title": "Hiker Found Again", "url": "https://example.com/b", "description": "",
+                 "content": "Crews found the missing hiker. [+1200 chars]"}
+            ]
+        }
+        mock_get.return_value = mock_response
+
+        articles = agent.fetch_news_articles("hiker")
+        assert len(articles) == 1
+        assert articles[0]["content"] == "Crews found the missing hiker. [+1200 chars]"
+
+def test_fetch_news_articles_reuses_recent_results(agent):
+    """Test that repeating a search shortly after reuses the cached GNews results."""
+    with patch.object(agent.session, "get") as mock_get:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "articles": [
+                {"title": "SAR Team Rescues Hiker", "url": "https://example.com/rescue", "description": "SAR teams saved a hiker."}
+            ]
+        }
+        mock_get.return_value = mock_response
+
+        first = agent.fetch_news_articles("hiker rescue")
+        second = agent.fetch_news_articles("hiker  rescue")
+        assert first == second
+        assert mock_get.call_count == 1
+
+        agent.fetch_news_articles("rescue NOT hiker")
+        agent.fetch_news_articles("hiker NOT rescue")
+        assert mock_get.call_count == 3
+
 def test_fetch_news_articles_empty(agent):
     """Test when the API returns no articles."""
-    with patch("requests.get") as mock_get:
+    with patch.object(agent.session, "get") as mock_get:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {"articles": []}
@@ -36,7 +156,7 @@ def test_fetch_news_articles_empty(agent):
 
 def test_fetch_news_articles_unauthorized(agent):
     """Test handling of unauthorized API access (invalid API key)."""
-    with patch("requests.get") as mock_get:
+    with patch.object(agent.session, "get") as mock_get:
         mock_response = MagicMock()
         mock_response.status_code = 401
         mock_get.return_value = mock_response
@@ -44,40 +164,396 @@ def test_fetch_news_articles_unauthorized(agent):
         articles = agent.fetch_news_articles("rescue")
         assert articles == []
 
-def test_check_relevance_with_openai(agent):
-    """Test OpenAI relevance verification for SAR articles."""
-    with patch.object(agent.client.chat.completions, "create") as mock_openai:
-        mock_openai.return_value.choices = [
-            MagicMock(message=MagicMock(content="Yes, this article is related to SAR operations."))
-        ]
+def test_classify_and_summarize_relevant(agent, openai_client):
+    """Test OpenAI relevance verification and summary for SAR articles."""
+    mock_openai = openai_client.chat.completions.create
+    mock_openai.return_value = chat_response([{
+        "i": 0,
+        "relevant": "yes",
+        "explanation": "This article is related to SAR operations.",
+        "summary": "Rescue teams saved 5 people."
+    }])
 
-        is_relevant, explanation = agent.check_relevance_with_openai("Rescue teams saved 5 people.", "rescue")
-        assert is_relevant
-        assert "sar operations" in explanation.lower()
+    is_relevant, explanation, summary = asyncio.run(
+        agent.classify_and_summarize("Rescue teams saved 5 people.", "rescue")
+    )
+    assert is_relevant
+    assert "sar operations" in explanation.lower()
+    assert summary == "Rescue teams saved 5 people."
+    assert mock_openai.call_count == 1
+    assert mock_openai.call_args.kwargs["response_format"] == {"type": "json_object"}
 
-def test_check_irrelevant_with_openai(agent):
+def test_classify_and_summarize_irrelevant(agent, openai_client):
     """Test OpenAI rejecting non-SAR-related articles."""
-    with patch.object(agent.client.chat.completions, "create") as mock_openai:
-        mock_openai.return_value.choices = [
-            MagicMock(message=MagicMock(content="No, this article is not related to SAR operations."))
-        ]
+    mock_openai = openai_client.chat.completions.create
+    mock_openai.return_value = chat_response([{
+        "i": 0,
+        "relevant": "no",
+        "explanation": "This article is not related to SAR operations.",
+        "summary": ""
+    }])
+
+    is_relevant, explanation, summary = asyncio.run(
+        agent.classify_and_summarize("Football team wins championship.", "sports")
+    )
+    assert not is_relevant
+    assert "not related to sar operations" in explanation.lower()
+    assert summary is None
+
+def test_classify_and_summarize_uses_cache(agent, openai_client):
+    """Test that a repeated article is answered from the cache without calling OpenAI."""
+    mock_openai = openai_client.chat.completions.create
+    mock_openai.return_value = chat_response([{
+        "i": 0,
+        "relevant": "yes",
+        "explanation": "This article is related to SAR operations.",
+        "summary": "Rescue teams saved 5 people."
+    }])
+
+    first = asyncio.run(agent.classify_and_summarize("Rescue teams saved 5 people.", "rescue"))
+    second = asyncio.run(agent.classify_and_summarize("Rescue teams saved 5 people.", "rescue"))
+    assert first == second
+    assert mock_openai.call_count == 1
+
+def test_classify_and_summarize_uses_semantic_cache(agent, openai_client):
+    """Test that a near-duplicate article reuses the previous verdict."""
+    openai_client.embeddings.create.side_effect = None
+    openai_client.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=fake_embedding("rescue"))])
+    mock_openai = openai_client.chat.completions.create
+    mock_openai.return_value = chat_response([{
+        "i": 0,
+        "relevant": "yes",
+        "explanation": "This article is related to SAR operations.",
+        "summary": "Rescue teams saved 5 people."
+    }])
+
+    first = asyncio.run(agent.classify_and_summarize("Rescue teams saved 5 people.", "rescue"))
+    second = asyncio.run(agent.classify_and_summarize("Rescuers saved five people.", "rescue"))
+    assert first == second
+    assert mock_openai.call_count == 1
 
-        is_relevant, explanation = agent.check_relevance_with_openai("Football team wins championship.", "sports")
-        assert not is_relevant
-        assert "not related to sar operations" in explanation.lower()
+def test_semantic_index_is_written_once_per_batch(agent, openai_client):
+    """Test that a batch of new verdicts is added to the semantic index in a single write."""
+    openai_client.chat.completions.create.return_value = chat_response([
+        {"i": i, "relevant": "yes", "explanation": "SAR related.", "summary": f"Rescue {i}."} for i in range(3)
+    ])
+    texts = [f"Rescue crews searched for hiker number {i}." for i in range(3)]
+
+    with patch.object(agent._cache, "set", wraps=agent._cache.set) as mock_set:
+        asyncio.run(agent.classify_and_summarize_batch(texts, "rescue"))
+    index_writes = [c for c in mock_set.call_args_list if c.args[0] == SEMANTIC_INDEX_KEY]
+    assert len(index_writes) == 1
+    assert len(agent._semantic_index[1]) == 3
+
+def test_semantic_index_is_shared_and_pruned(agent, tmp_path):
+    """Test that agents sharing a cache keep each other's entries and drop expired ones."""
+    other = MediaAnalysisAgent(cache_dir=str(tmp_path / "cache"))
+    agent._remember_verdicts([(normalized_embedding("old"), (True, "Old.", "Old summary."))])
+    other._remember_verdicts([(normalized_embedding("flood"), (True, "Flood.", "Flood summary."))])
+    agent._remember_verdicts([(normalized_embedding("fire"), (True, "Fire.", "Fire summary."))])
+    assert len(agent._semantic_index[1]) == 3
+
+    with patch("sar_project.agents.media_analysis_agent.time.time", return_value=time.time() + CACHE_EXPIRE_SECONDS + 1):
+        assert agent._load_semantic_index() is None
+
+def test_semantic_index_is_loaded_on_first_use(agent, tmp_path, openai_client):
+    """Test that a new agent reads the stored index only when it first analyzes articles."""
+    agent._remember_verdicts([(normalized_embedding("Search words: rescue\n\nCrews found the hiker."),
+                               (True, "SAR related.", "Hiker found."))])
+    other = MediaAnalysisAgent(cache_dir=str(tmp_path / "cache"))
+    assert other._semantic_index is None
+
+    verdict = asyncio.run(other.classify_and_summarize("Crews found the hiker.", "rescue"))
+    assert verdict == (True, "SAR related.", "Hiker found.")
+    assert openai_client.chat.completions.create.call_count == 0
+
+def test_semantic_index_dimension_mismatch_is_a_miss(agent):
+    """Test that an index built with differently sized embeddings is not compared against."""
+    agent._remember_verdicts([(normalized_embedding("rescue"), (True, "SAR related.", "Summary."))])
+    assert agent._find_similar_verdict(normalized_embedding("rescue")) is not None
+    assert agent._find_similar_verdict(np.ones(8, dtype="float32") / np.sqrt(8)) is None
+
+def test_openai_wait_honors_retry_after():
+    """Test that a Retry-After header from OpenAI sets the backoff delay."""
+    error = MagicMock(response=MagicMock(headers={"retry-after": "7"}))
+    retry_state = MagicMock(attempt_number=1)
+    retry_state.outcome.exception.return_value = error
+    assert _openai_wait(retry_state) == 7
+
+    error.response.headers = {}
+    assert 0 <= _openai_wait(retry_state) <= 30
+
+def test_session_caps_retry_after(agent):
+    """Test that the HTTP session waits at most MAX_RETRY_AFTER_SECONDS for a Retry-After."""
+    retries = agent.session.get_adapter("https://gnews.io").max_retries
+    assert retries.get_retry_after(MagicMock(headers={"Retry-After": "3600"})) == MAX_RETRY_AFTER_SECONDS
+    assert retries.get_retry_after(MagicMock(headers={"Retry-After": "2"})) == 2
+    assert retries.new(total=1).get_retry_after(MagicMock(headers={"Retry-After": "3600"})) == MAX_RETRY_AFTER_SECONDS
+
+def test_compress_strips_boilerplate(agent):
+    """Test that filler and boilerplate are removed before text is sent to OpenAI."""
+    text = ("Rescue   teams basically saved 5 hikers.\n\nWe use cookies to improve your experience. "
+            "The search was very difficult... [+1532 chars]")
+    assert agent._compress(text) == "Rescue teams saved 5 hikers. The search was very difficult..."
+
+def test_compress_keeps_story_sentences(agent):
+    """Test that story sentences mentioning sign-ups or cookies are not mistaken for boilerplate."""
+    text = ("Residents are urged to sign up for emergency alerts as crews search for two missing hikers "
+            "near Big Sur. Volunteers handed out cookies at the command post.")
+    assert agent._compress(text) == text
+
+def test_classify_and_summarize_skips_text_emptied_by_compression(agent, openai_client):
+    """Test that an article that is only boilerplate is not sent to OpenAI."""
+    is_relevant, explanation, summary = asyncio.run(
+        agent.classify_and_summarize("We use cookies to improve your experience. [+1532 chars]", "rescue")
+    )
+    assert not is_relevant
+    assert explanation == "Article has no valid content to analyze."
+    assert openai_client.embeddings.create.call_count == 0
+    assert openai_client.chat.completions.create.call_count == 0
 
 def test_analyze_media_success(agent):
     """Test the full media analysis workflow."""
     with patch.object(agent, "fetch_news_articles") as mock_fetch, \
-         patch.object(agent, "check_relevance_with_openai") as mock_relevance, \
-         patch.object(agent, "get_keywords_from_user", return_value="rescue"):
+         patch.object(agent, "classify_and_summarize_batch") as mock_classify:
 
         mock_fetch.return_value = [
             {"title": "Wildfire Rescue Efforts", "url": "https://example.com/fire-rescue", "content": "SAR teams evacuated families from a wildfire zone."}
         ]
-        mock_relevance.return_value = (True, "Yes, this article discusses an active SAR operation.")
+        mock_classify.return_value = [(
+            True,
+            "Yes, this article discusses an active SAR operation.",
+            "SAR teams evacuated families."
+        )]
 
-        results = agent.analyze_media()
+        results = agent.analyze_media(["rescue"])
         assert len(results) == 1
         assert results[0]["title"] == "Wildfire Rescue Efforts"
         assert "active SAR operation" in results[0]["relevance"]
+        assert results[0]["summary"] == "SAR teams evacuated families."
+
+def test_analyze_media_batches_articles(agent, openai_client):
+    """Test that a full page of GNews articles is checked in a single OpenAI request."""
+    articles = [
+        {"title": f"Article {i}", "url": f"https://example.com/{i}", "content": f"Rescue news number {i}."}
+        for i in range(10)
+    ]
+    mock_openai = openai_client.chat.completions.create
+    with patch.object(agent, "fetch_news_articles", return_value=articles):
+        mock_openai.return_value = chat_response([
+            {"i": i, "relevant": "yes" if i % 2 == 0 else "no", "explanation": f"Reason {i}.",
+             "summary": f"Summary {i}." if i % 2 == 0 else ""}
+            for i in range(10)
+        ])
+
+        results = agent.analyze_media(["rescue"])
+        assert mock_openai.call_count == 1
+        assert mock_openai.call_args.kwargs["max_tokens"] == 10 * MAX_TOKENS_PER_ARTICLE
+        assert [r["title"] for r in results] == ["Article 0", "Article 2", "Article 4", "Article 6", "Article 8"]
+        assert results[1]["summary"] == "Summary 2."
+
+def test_analyze_media_skips_articles_without_keywords(agent):
+    """Test that articles mentioning none of the search words never reach OpenAI."""
+    articles = [
+        {"title": "Hikers Rescued", "url": "https://example.com/rescue", "content": "SAR teams found two hikers."},
+        {"title": "Local Team Wins", "url": "https://example.com/sports", "content": "The final score was 3-1."}
+    ]
+    with patch.object(agent, "fetch_news_articles", return_value=articles), \
+         patch.object(agent, "classify_and_summarize_batch") as mock_classify:
+        mock_classify.return_value = [(True, "About a rescue.", "Two hikers were found.")]
+
+        results = agent.analyze_media(["rescued", "hikers"])
+        mock_classify.assert_called_once_with(["SAR teams found two hikers."], "rescued hikers")
+        assert [r["title"] for r in results] == ["Hikers Rescued"]
+
+def test_request_verdicts_splits_truncated_batch(agent, openai_client):
+    """Test that a batch whose response was cut off is retried as two smaller batches."""
+    truncated = MagicMock(choices=[MagicMock(message=MagicMock(content='{"articles": [{"i": 0'), finish_reason="length")])
+    openai_client.chat.completions.create.side_effect = [
+        truncated,
+        chat_response([{"i": i, "relevant": "yes", "explanation": "SAR related.", "summary": f"Rescue {i}."} for i in range(2)]),
+        chat_response([{"i": i, "relevant": "no", "explanation": "Not SAR related.", "summary": ""} for i in range(2)]),
+    ]
+    texts = [f"Article number {i} about the search." for i in range(4)]
+
+    verdicts = asyncio.run(agent.classify_and_summarize_batch(texts, "rescue"))
+    assert [v[0] for v in verdicts] == [True, True, False, False]
+    assert verdicts[1][2] == "Rescue 1."
+    assert openai_client.chat.completions.create.call_count == 3
+
+def test_request_verdicts_retries_only_the_failing_half(agent, openai_client):
+    """Test that a rate-limited half is retried on its own, without re-sending the truncated batch."""
+    truncated = MagicMock(choices=[MagicMock(message=MagicMock(content='{"articles": [{"i": 0'), finish_reason="length")])
+    rate_limited = RateLimitError(
+        "Rate limit reached",
+        response=httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions")),
+        body=None
+    )
+
+    async def create(**kwargs):
+        prompt = kwargs["messages"][0]["content"]
+        if "---ARTICLE 1---" in prompt:
+            return truncated
+        if "first article" in prompt:
+            raise rate_limited
+        return chat_response([{"i": 0, "relevant": "yes", "explanation": "SAR related.", "summary": "Rescue."}])
+
+    openai_client.chat.completions.create.side_effect = create
+    texts = ["The first article about the search.", "The second article about the search."]
+
+    with patch.object(MediaAnalysisAgent._create_completion.retry, "wait", wait_none()):
+        verdicts = asyncio.run(agent.classify_and_summarize_batch(texts, "rescue"))
+    assert verdicts[0][0] is False
+    assert verdicts[1] == (True, "SAR related.", "Rescue.")
+    # One truncated batch, five attempts for the failing half, one for the other half
+    assert openai_client.chat.completions.create.call_count == 7
+
+def test_request_verdicts_handles_empty_response(agent, openai_client):
+    """Test that a response without content leaves each article without a verdict."""
+    openai_client.chat.completions.create.return_value = MagicMock(
+        choices=[MagicMock(message=MagicMock(content=None), finish_reason="content_filter")]
+    )
+
+    verdicts = asyncio.run(agent._request_verdicts(openai_client, ["Crews found the hiker."], "rescue", asyncio.Semaphore(1)))
+    assert verdicts == [None]
+
+def test_make_batches_respects_char_budget(agent):
+    """Test that long articles are split across requests to stay within the character budget."""
+    article_texts = ["x" * ARTICLE_CHAR_LIMIT] * 20
+    items = [(i, None) for i in range(20)]
+    batches = agent._make_batches(items, article_texts)
+    assert [len(batch) for batch in batches] == [15, 5]
+
+def test_search_and_analyze_runs_queries_concurrently(agent):
+    """Test that several queries can share one event loop without blocking each other."""
+    def fake_fetch(query):
+        return [{"title": query, "url": f"https://example.com/{query}", "content": f"{query} rescue news."}]
+
+    async def fake_batch(article_texts, query):
+        await asyncio.sleep(0.01)
+        return [(True, f"About {query}.", f"Summary of {query}.") for _ in article_texts]
+
+    async def run_queries():
+        return await asyncio.gather(*[agent.search_and_analyze(q) for q in ["flood", "avalanche"]])
+
+    with patch.object(agent, "fetch_news_articles", side_effect=fake_fetch), \
+         patch.object(agent, "classify_and_summarize_batch", side_effect=fake_batch):
+
+        flood, avalanche = asyncio.run(run_queries())
+        assert flood[0]["title"] == "flood"
+        assert avalanche[0]["summary"] == "Summary of avalanche."
+
+def test_concurrent_searches_share_one_semaphore(agent, openai_client):
+    """Test that gathered searches share the OpenAI request limit of their event loop."""
+    openai_client.chat.completions.create.return_value = chat_response([
+        {"i": 0, "relevant": "yes", "explanation": "SAR related.", "summary": "Summary."}
+    ])
+    semaphores = []
+    original = agent._request_verdicts
+
+    async def spy(client, article_texts, query, semaphore):
+        semaphores.append(semaphore)
+        return await original(client, article_texts, query, semaphore)
+
+    async def run():
+        return await asyncio.gather(
+            agent.classify_and_summarize("Crews rescued a climber.", "climber"),
+            agent.classify_and_summarize("Divers found the missing boat.", "boat")
+        )
+
+    with patch.object(agent, "_request_verdicts", side_effect=spy):
+        asyncio.run(run())
+    assert len(semaphores) == 2
+    assert semaphores[0] is semaphores[1]
+
+def test_analyze_media_from_several_threads(agent):
+    """Test that the sync entry point can be called from several threads at once."""
+    barrier = threading.Barrier(2)
+
+    def fake_fetch(query):
+        barrier.wait(timeout=5)
+        return [{"title": query, "url": f"https://example.com/{query}", "content": f"{query} rescue news."}]
+
+    async def fake_batch(article_texts, query):
+        await asyncio.sleep(0.01)
+        return [(True, f"About {query}.", f"Summary of {query}.") for _ in article_texts]
+
+    with patch.object(agent, "fetch_news_articles", side_effect=fake_fetch), \
+         patch.object(agent, "classify_and_summarize_batch", side_effect=fake_batch):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            flood, avalanche = executor.map(agent.analyze_media, [["flood"], ["avalanche"]])
+
+    assert flood[0]["title"] == "flood"
+    assert avalanche[0]["title"] == "avalanche"
+
+def test_process_request_from_running_event_loop(agent):
+    """Test that the sync entry point still works when called from inside an event loop."""
+    async def fake_batch(article_texts, query):
+        return [(True, "About a flood.", "Summary.") for _ in article_texts]
+
+    async def handler():
+        return agent.process_request({"action": "search_news", "keywords": ["flood"]})
+
+    articles = [{"title": "Flood", "url": "https://example.com/flood", "content": "Flood rescue news."}]
+    with patch.object(agent, "fetch_news_articles", return_value=articles), \
+         patch.object(agent, "classify_and_summarize_batch", side_effect=fake_batch):
+        results = asyncio.run(handler())
+
+    assert results[0]["title"] == "Flood"
+
+def test_analyze_media_does_not_prompt_when_not_interactive(agent, monkeypatch):
+    """Test that no input() prompt blocks a non-interactive run without keywords."""
+    # SAR_KEYWORDS may come from a local .env, which would turn this into a real search
+    monkeypatch.delenv("SAR_KEYWORDS", raising=False)
+    with patch("sys.stdin.isatty", return_value=False), \
+         patch.object(agent.session, "get") as mock_get, \
+         patch.object(agent, "get_keywords_from_user") as mock_prompt:
+
+        results = agent.analyze_media()
+        mock_prompt.assert_not_called()
+        mock_get.assert_not_called()
+        assert "error" in results[0]
+
+def test_process_request_passes_keywords(agent):
+    """Test that keywords in the request are used instead of prompting the user."""
+    with patch.object(agent, "fetch_news_articles", return_value=[]) as mock_fetch, \
+         patch.object(agent, "get_keywords_from_user") as mock_prompt:
+
+        agent.process_request({"action": "search_news", "keywords": ["flood", "rescue"]})
+        mock_prompt.assert_not_called()
+        mock_fetch.assert_called_once_with("flood rescue")
+
+def test_process_request_accepts_keyword_string(agent):
+    """Test that keywords given as one string are not split into characters."""
+    with patch.object(agent, "fetch_news_articles", return_value=[]) as mock_fetch:
+        agent.process_request({"action": "search_news", "keywords": "flood rescue"})
+        mock_fetch.assert_called_once_with("flood rescue")
+
+def test_analyze_media_without_stdin(agent, monkeypatch):
+    """Test that a run without stdin (daemons, pythonw) does not prompt or crash."""
+    monkeypatch.delenv("SAR_KEYWORDS", raising=False)
+    monkeypatch.setattr("sys.stdin", None)
+    with patch.object(agent.session, "get") as mock_get, \
+         patch.object(agent, "get_keywords_from_user") as mock_prompt:
+        results = agent.analyze_media()
+        mock_prompt.assert_not_called()
+        mock_get.assert_not_called()
+        assert "error" in results[0]
+
+def test_analyze_media_uses_default_keywords(tmp_path, monkeypatch):
+    """Test that keywords from the constructor or SAR_KEYWORDS are used without prompting."""
+    monkeypatch.setenv("SAR_KEYWORDS", "ignored")
+    agent = MediaAnalysisAgent(cache_dir=str(tmp_path / "cache"), keywords=["avalanche"])
+    with patch.object(agent, "fetch_news_articles", return_value=[]) as mock_fetch, \
+         patch.object(agent, "get_keywords_from_user") as mock_prompt:
+        agent.analyze_media()
+        mock_fetch.assert_called_once_with("avalanche")
+        mock_prompt.assert_not_called()
+
+    agent = MediaAnalysisAgent(cache_dir=str(tmp_path / "cache"))
+    with patch.dict("os.environ", {"SAR_KEYWORDS": "flood, rescue"}), \
+         patch.object(agent, "fetch_news_articles", return_value=[]) as mock_fetch, \
+         patch.object(agent, "get_keywords_from_user") as mock_prompt:
+        agent.analyze_media()
+        mock_fetch.assert_called_once_with("flood rescue")
+        mock_prompt.assert_not_called()